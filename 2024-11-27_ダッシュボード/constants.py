@@ -20,4 +20,8 @@ CHART_BOTTOM_AXIS_TITLE = "データラベル"
 
 # ウィンドウ最小サイズ
 MIN_WINDOW_WIDTH = 800
-MIN_WINDOW_HEIGHT = 600
\ No newline at end of file
+MIN_WINDOW_HEIGHT = 600
+
+# アップロード設定（Web モード）
+UPLOAD_DIR = "uploads"
+UPLOAD_URL_EXPIRES = 600  # アップロードURLの有効期限（秒）
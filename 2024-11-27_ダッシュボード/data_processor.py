@@ -1,25 +1,297 @@
 import pandas as pd
 import asyncio
+import bz2
+import gzip
+import io
 import logging
+import os
+import queue
+import threading
+import zipfile
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import zstandard  # .zst 形式の展開に使用（任意の依存関係）
+except ImportError:
+    zstandard = None
+
+# 展開スレッドから一度に読み出すバイト数
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+# 展開済みチャンクを保持するキューの最大長（メモリ使用量の上限）
+DECOMPRESS_QUEUE_SIZE = 8
+# スキーマ推定に使うサンプル行数
+SCHEMA_SAMPLE_ROWS = 1000
+
+
+class _CountingReader(io.RawIOBase):
+    """読み込んだ圧縮前バイト数を数え、進捗を通知するファイルラッパー"""
+
+    def __init__(self, raw, total: int, report: Optional[Callable[[int, int], None]] = None):
+        self._raw = raw
+        self._report = report
+        self.restart(total)
+
+    def restart(self, total: int):
+        """進捗の計測をやり直す（ZIPはメンバーを開いた後、その圧縮サイズで計測する）
+        Args:
+            total (int): 進捗の分母とするバイト数
+        """
+        self._total = total
+        self._consumed = 0
+        self._reported = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._raw.seekable()  # zipfileはシーク可能なファイルを必要とする
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._raw.seek(offset, whence)
+
+    def tell(self):
+        return self._raw.tell()
+
+    def readinto(self, b):
+        n = self._raw.readinto(b)
+        if n:
+            self._on_read(n)
+        return n
+
+    def _on_read(self, n: int):
+        """読み込んだバイト数の加算と進捗の通知"""
+        self._consumed = min(self._consumed + n, self._total)  # ヘッダ等の読み込みで分母を超えないようにする
+        # 通知が多すぎないよう、チャンク単位と読み込み完了時のみ通知
+        if self._report is not None and (
+            self._consumed - self._reported >= DECOMPRESS_CHUNK_SIZE or self._consumed >= self._total
+        ) and self._consumed > self._reported:
+            self._reported = self._consumed
+            self._report(self._consumed, self._total)
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+class _ZipMember:
+    """ZIP内のCSVを読み込み、閉じる際にアーカイブも閉じるラッパー"""
+
+    def __init__(self, archive: zipfile.ZipFile, member: str):
+        self._archive = archive
+        self._member = archive.open(member)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._member.read(size)
+
+    def close(self):
+        self._member.close()
+        self._archive.close()
+
+
+class _PipelinedReader(io.RawIOBase):
+    """別スレッドで展開したチャンクをキュー経由で受け取るストリーム"""
+
+    def __init__(self, source, raw: io.RawIOBase):
+        self._source = source
+        self._raw = raw  # 展開ストリームは元のファイルを閉じないため個別に保持
+        self._queue = queue.Queue(maxsize=DECOMPRESS_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()  # 展開とパースを並行して実行
+
+    def _put(self, item) -> bool:
+        """停止要求を確認しながらキューへ投入"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        """展開スレッドの本体"""
+        try:
+            while not self._stop.is_set():
+                chunk = self._source.read(DECOMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if not self._put(chunk):
+                    return
+            self._put(None)  # 終端を通知
+        except Exception as e:
+            self._put(e)  # 例外はパース側で再送出する
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self._eof:
+            item = self._queue.get()
+            if item is None:
+                self._eof = True
+            elif isinstance(item, Exception):
+                self._eof = True
+                raise item
+            else:
+                self._buffer = memoryview(item)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self):
+        self._stop.set()  # nrows指定などで途中終了した場合も展開スレッドを止める
+        self._thread.join()
+        self._source.close()
+        self._raw.close()
+        super().close()
+
 
 class DataProcessor:
     """データ処理クラス"""
-    async def load_csv(self, file_path: str) -> pd.DataFrame:
+    # 読み込み可能な拡張子（FilePickerは最後の拡張子で判定する）
+    SUPPORTED_EXTENSIONS = ["csv", "gz", "zst", "bz2", "zip"]
+
+    async def load_csv(
+        self,
+        file_path: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        usecols: Optional[List[Union[str, int]]] = None,
+        dtype: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
         """CSVファイルの非同期読み込み
+        .csv.gz / .csv.zst / .csv.bz2 / .zip は一時ファイルを作らずに
+        ストリームで展開しながら読み込む。
         Args:
             file_path (str): 読み込むCSVファイルのパス
+            on_progress (Callable[[int, int], None], optional):
+                進捗通知（読み込み済みの圧縮バイト数, ファイルサイズ）。イベントループ上で呼ばれる
+            usecols (List[Union[str, int]], optional): 読み込む列名または列の位置（省略時は全列）
+            dtype (Dict[str, str], optional): 列ごとの型（指定した列は型推定を行わない）
         Returns:
             pd.DataFrame: 読み込まれたデータフレーム
         """
         try:
             loop = asyncio.get_running_loop()  # 現在のイベントループを取得
-            df = await loop.run_in_executor(None, pd.read_csv, file_path)  # 非同期でCSVを読み込む
+            report = None
+            if on_progress is not None:
+                # 進捗は展開スレッドから届くため、イベントループへ受け渡す
+                report = lambda done, total: loop.call_soon_threadsafe(on_progress, done, total)
+            df = await loop.run_in_executor(
+                None, lambda: self._read_csv(file_path, report, usecols=usecols, dtype=dtype)
+            )  # 非同期でCSVを読み込む
             logging.info(f"CSVファイル '{file_path}' を読み込みました。")  # 読み込み成功のログを記録
             return df
         except Exception as e:
             logging.error(f"CSVファイル '{file_path}' の読み込み中にエラーが発生しました: {e}")  # エラーログを記録
             raise  # 例外を再送出
 
+    async def load_schema(
+        self, file_path: str, sample_rows: int = SCHEMA_SAMPLE_ROWS
+    ) -> Tuple[Dict[str, str], pd.DataFrame]:
+        """ヘッダとサンプル行だけを読み込み、列の型を推定する
+        Args:
+            file_path (str): 読み込むCSVファイルのパス
+            sample_rows (int): 型推定に使う行数
+        Returns:
+            Tuple[Dict[str, str], pd.DataFrame]: 列名と型の対応、サンプルのデータフレーム
+        """
+        try:
+            loop = asyncio.get_running_loop()  # 現在のイベントループを取得
+            sample = await loop.run_in_executor(
+                None, lambda: self._read_csv(file_path, nrows=sample_rows)
+            )  # 先頭のサンプル行のみ読み込む
+            schema = self._infer_schema(sample)
+            logging.info(f"CSVファイル '{file_path}' のスキーマを読み込みました。")  # 読み込み成功のログを記録
+            return schema, sample
+        except Exception as e:
+            logging.error(f"CSVファイル '{file_path}' のスキーマ読み込み中にエラーが発生しました: {e}")  # エラーログを記録
+            raise  # 例外を再送出
+
+    def _infer_schema(self, sample: pd.DataFrame) -> Dict[str, str]:
+        """サンプルから列の型を決定
+        整数列はサンプル外に欠損値があっても読み込めるよう float64 として扱う。
+        Args:
+            sample (pd.DataFrame): サンプルのデータフレーム
+        Returns:
+            Dict[str, str]: 列名と型の対応
+        """
+        schema = {}
+        for col, dtype in sample.dtypes.items():
+            if pd.api.types.is_bool_dtype(dtype):
+                schema[col] = "object"
+            elif pd.api.types.is_numeric_dtype(dtype):
+                schema[col] = "float64"
+            else:
+                schema[col] = "object"
+        return schema
+
+    def _read_csv(self, file_path: str, report: Optional[Callable[[int, int], None]] = None, **kwargs) -> pd.DataFrame:
+        """CSVファイルの読み込み（圧縮形式を含む）
+        Args:
+            file_path (str): 読み込むCSVファイルのパス
+            report (Callable[[int, int], None], optional): 進捗通知
+            **kwargs: pd.read_csv に渡す引数
+        Returns:
+            pd.DataFrame: 読み込まれたデータフレーム
+        """
+        stream = self._open_stream(file_path, report)
+        try:
+            return pd.read_csv(stream, **kwargs)
+        finally:
+            stream.close()
+
+    def _open_stream(self, file_path: str, report: Optional[Callable[[int, int], None]] = None) -> io.BufferedReader:
+        """拡張子に応じて展開済みのバイトストリームを開く
+        Args:
+            file_path (str): 開くファイルのパス
+            report (Callable[[int, int], None], optional): 進捗通知
+        Returns:
+            io.BufferedReader: CSVのバイトストリーム
+        """
+        raw = _CountingReader(open(file_path, "rb"), os.path.getsize(file_path), report)
+        try:
+            source = self._decompress(raw, file_path.lower())
+        except Exception:
+            raw.close()
+            raise
+        if source is raw:
+            return io.BufferedReader(raw)  # 非圧縮ファイルはそのまま読み込む
+        return io.BufferedReader(_PipelinedReader(source, raw), DECOMPRESS_CHUNK_SIZE)
+
+    def _decompress(self, raw: _CountingReader, name: str):
+        """拡張子に応じた展開ストリームを作成
+        Args:
+            raw (_CountingReader): 圧縮ファイルのストリーム
+            name (str): 小文字に変換したファイル名
+        Returns:
+            展開済みのバイトを返すファイルライクオブジェクト
+        """
+        base, ext = os.path.splitext(name)
+        if ext in (".gz", ".bz2", ".zst") and not base.endswith(".csv"):
+            # .tar.gz や .json.gz などCSV以外の圧縮ファイルは読み込まない
+            raise ValueError(f"対応していないファイル形式です（.csv{ext} のみ対応）: {os.path.basename(name)}")
+        if name.endswith(".gz"):
+            return gzip.GzipFile(fileobj=raw)
+        if name.endswith(".bz2"):
+            return bz2.BZ2File(raw)
+        if name.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError(".zst ファイルの読み込みには zstandard パッケージが必要です")
+            return zstandard.ZstdDecompressor().stream_reader(raw)
+        if name.endswith(".zip"):
+            archive = zipfile.ZipFile(raw)
+            members = [m for m in archive.namelist() if m.lower().endswith(".csv")]
+            if not members:
+                archive.close()
+                raise ValueError("ZIPファイル内にCSVファイルが見つかりません")
+            raw.restart(archive.getinfo(members[0]).compress_size)  # 中央ディレクトリの読み込みは進捗に含めない
+            return _ZipMember(archive, members[0])
+        return raw
+
     async def process_data(self, df: pd.DataFrame) -> dict:
         """データ処理の非同期実行
         Args:
@@ -51,4 +323,5 @@ class DataProcessor:
                 'mean': df[col].mean(),  # 平均を計算
                 'sum': df[col].sum()  # 合計を計算
             }
-        return stats 
\ No newline at end of file
+        return stats
+
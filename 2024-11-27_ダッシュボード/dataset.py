@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from data_processor import DataProcessor
+
+# グラフ用に共有する系列の最大点数（行数やセッション数によらずメモリを一定にする）
+CHART_MAX_POINTS = 500
+
+
+class Dataset:
+    """スキーマを先に読み込み、列を必要になった時点で読み込むデータセットクラス
+    複数のセッションから共有されるため、読み込んだ列・統計情報・グラフ系列は読み取り専用として扱う。
+    """
+
+    def __init__(self, file_path: str, schema: Dict[str, str], sample: pd.DataFrame,
+                 data_processor: DataProcessor):
+        """データセットの初期化
+        Args:
+            file_path (str): CSVファイルのパス
+            schema (Dict[str, str]): 列名と型の対応
+            sample (pd.DataFrame): 先頭のサンプル行
+            data_processor (DataProcessor): 列の読み込みに使うデータ処理クラス
+        """
+        self.file_path = file_path
+        self.schema = schema
+        self.sample = sample
+        self.data_processor = data_processor
+        self.content_hash: Optional[str] = None  # レジストリに登録される際に設定
+        self._lock = threading.Lock()  # セッションごとに別スレッド・別ループから呼ばれる場合に備える
+        self._columns: Dict[str, pd.Series] = {}  # 読み込み済みの列
+        self._pending: Dict[str, Future] = {}  # 読み込み中の列
+        self._stats: Dict[str, dict] = {}  # 列ごとの統計情報
+        self._chart_series: Dict[str, Tuple[Tuple[int, float], ...]] = {}  # 列ごとの間引き済みグラフ系列
+        self._progress: Dict[Future, List[Callable[[int, int], None]]] = {}  # 読み込みごとの進捗通知先
+        self._tasks: Set[asyncio.Task] = set()  # 実行中の読み込みタスク（GCされないよう保持）
+
+    @classmethod
+    async def open(cls, file_path: str, data_processor: DataProcessor) -> "Dataset":
+        """ヘッダとサンプルのみを読み込んでデータセットを作成
+        Args:
+            file_path (str): CSVファイルのパス
+            data_processor (DataProcessor): データ処理クラス
+        Returns:
+            Dataset: 作成されたデータセット
+        """
+        schema, sample = await data_processor.load_schema(file_path)
+        return cls(file_path, schema, sample, data_processor)
+
+    def share_from(self, other: "Dataset"):
+        """同じ内容のデータセットと、列・統計情報・グラフ系列の保存先を共有する
+        以降はどちらから読み込んでも1度だけパースされる。
+        Args:
+            other (Dataset): 共有先のデータセット
+        """
+        with other._lock, self._lock:
+            for col, series in self._columns.items():
+                other._columns.setdefault(col, series)
+            for col, future in self._pending.items():
+                other._pending.setdefault(col, future)
+            for col, stats in self._stats.items():
+                other._stats.setdefault(col, stats)
+            for col, points in self._chart_series.items():
+                other._chart_series.setdefault(col, points)
+            other._progress.update(self._progress)
+            self.schema = other.schema
+            self._columns = other._columns
+            self._pending = other._pending
+            self._stats = other._stats
+            self._chart_series = other._chart_series
+            self._progress = other._progress
+            self._lock = other._lock
+
+    @property
+    def columns(self) -> List[str]:
+        """全列名"""
+        return list(self.schema)
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        """数値列名"""
+        return [col for col, dtype in self.schema.items() if dtype == "float64"]
+
+    async def get_columns(self, names: List[str],
+                          on_progress: Optional[Callable[[int, int], None]] = None) -> pd.DataFrame:
+        """指定した列のデータを取得（未読み込みの列はバックグラウンドで読み込む）
+        Args:
+            names (List[str]): 取得する列名
+            on_progress (Callable[[int, int], None], optional): 読み込み進捗の通知
+        Returns:
+            pd.DataFrame: 指定した列のみを含むデータフレーム
+                （pandas の Copy-on-Write により、変更しても共有データには影響しない）
+        """
+        with self._lock:
+            missing = [col for col in names if col not in self._columns and col not in self._pending]
+            if missing:
+                # 未読み込みの列はまとめて1回のパースで読み込む。
+                # 要求したセッションがキャンセルされても他のセッションの待機に影響しないよう、独立したタスクで実行する
+                future = Future()
+                for col in missing:
+                    self._pending[col] = future
+                self._progress[future] = []
+                task = asyncio.create_task(self._load_columns(missing, future))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            waiting = {self._pending[col] for col in names if col in self._pending}
+            if on_progress is not None:
+                # 読み込みを開始したセッションに限らず、待機中のすべてのセッションへ進捗を通知する
+                for future in waiting:
+                    self._progress.setdefault(future, []).append(on_progress)
+        try:
+            for future in waiting:
+                await asyncio.shield(asyncio.wrap_future(future))
+        finally:
+            if on_progress is not None:
+                with self._lock:
+                    for future in waiting:
+                        callbacks = self._progress.get(future, [])
+                        if on_progress in callbacks:
+                            callbacks.remove(on_progress)  # キャンセルされたセッションへは通知しない
+        with self._lock:
+            return pd.DataFrame({col: self._columns[col] for col in names}, copy=False)
+
+    async def get_stats(self, column: str) -> dict:
+        """列の統計情報を取得（計算結果はセッション間で共有）
+        Args:
+            column (str): 列名
+        Returns:
+            dict: 件数・平均・合計
+        """
+        with self._lock:
+            stats = self._stats.get(column)
+        if stats is None:
+            series = (await self.get_columns([column]))[column]
+            if column not in self.numeric_columns:
+                raise ValueError(f"列 '{column}' は数値列ではありません")  # 読み込み時に型が変わった場合
+            loop = asyncio.get_running_loop()
+            stats = await loop.run_in_executor(None, lambda: {
+                'count': len(series),  # データ件数
+                'mean': series.mean(),  # 平均
+                'sum': series.sum(),  # 合計
+            })
+            with self._lock:
+                stats = self._stats.setdefault(column, stats)
+        return stats
+
+    async def get_chart_series(self, column: str) -> Tuple[Tuple[int, float], ...]:
+        """グラフ表示用の系列を取得（間引いた結果はセッション間で共有）
+        Args:
+            column (str): 列名
+        Returns:
+            Tuple[Tuple[int, float], ...]: 行番号とY値の組（最大 CHART_MAX_POINTS 点）
+        """
+        with self._lock:
+            points = self._chart_series.get(column)
+        if points is None:
+            series = (await self.get_columns([column]))[column]
+            loop = asyncio.get_running_loop()
+            points = await loop.run_in_executor(None, self._downsample, series)
+            with self._lock:
+                points = self._chart_series.setdefault(column, points)
+        return points
+
+    def _downsample(self, series: pd.Series) -> Tuple[Tuple[int, float], ...]:
+        """グラフ表示用に等間隔で間引く（欠損値は除外）
+        Args:
+            series (pd.Series): 対象の列
+        Returns:
+            Tuple[Tuple[int, float], ...]: 行番号とY値の組
+        """
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        if len(values) <= CHART_MAX_POINTS:
+            indices = np.arange(len(values))
+        else:
+            indices = np.unique(np.linspace(0, len(values) - 1, CHART_MAX_POINTS).astype(int))
+        return tuple((int(i), float(values[i])) for i in indices if not np.isnan(values[i]))
+
+    def _notify_progress(self, future: Future, done: int, total: int):
+        """読み込みの進捗を待機中のセッションへ通知
+        Args:
+            future (Future): 対象の読み込み
+            done (int): 読み込み済みのバイト数
+            total (int): 全体のバイト数
+        """
+        with self._lock:
+            callbacks = list(self._progress.get(future, []))
+        for callback in callbacks:
+            try:
+                callback(done, total)
+            except Exception as e:
+                # 終了したセッションなどで失敗した通知先は、他のセッションに影響しないよう外す
+                logging.warning(f"進捗の通知に失敗したため、通知先から外します: {e}")
+                with self._lock:
+                    if callback in self._progress.get(future, []):
+                        self._progress[future].remove(callback)
+
+    async def _load_columns(self, names: List[str], future: Future):
+        """列の読み込み（usecols と明示的な型指定で必要な列のみパース）
+        Args:
+            names (List[str]): 読み込む列名
+            future (Future): 読み込み完了を他のセッションへ通知するFuture
+        """
+        on_progress = lambda done, total: self._notify_progress(future, done, total)
+        try:
+            dtype = {col: self.schema[col] for col in names}
+            # 重複した列名でも確実に一致するよう、列の位置で指定する
+            positions = [self.columns.index(col) for col in names]
+            try:
+                df = await self.data_processor.load_csv(
+                    self.file_path, on_progress=on_progress, usecols=positions, dtype=dtype
+                )
+            except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeError):
+                raise  # CSVの構造や文字コードの問題は読み直しても解決しない
+            except ValueError:
+                # サンプル外に型の合わない値がある場合は、文字列のまま読み直して列ごとに数値へ変換する
+                logging.warning(f"列 {names} の型指定に失敗したため、列ごとに変換して読み込み直します。")
+                df = await self.data_processor.load_csv(
+                    self.file_path, on_progress=on_progress, usecols=positions,
+                    dtype={col: "object" for col in names}
+                )
+                for col in names:
+                    if self.schema[col] != "float64":
+                        continue
+                    try:
+                        df[col] = pd.to_numeric(df[col]).astype("float64")
+                    except (ValueError, TypeError):
+                        with self._lock:
+                            self.schema[col] = "object"  # 数値でない値を含む列のみ型を変更
+            with self._lock:
+                for col in names:
+                    self._columns[col] = df[col]
+            future.set_result(None)
+        except BaseException as e:
+            # 待機中のセッションが止まったままにならないよう、キャンセルを含めて必ず完了させる
+            # （例外はFuture経由で各セッションへ伝えるため、タスクからは再送出しない）
+            future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            with self._lock:
+                for col in names:
+                    if self._pending.get(col) is future:
+                        del self._pending[col]
+                self._progress.pop(future, None)
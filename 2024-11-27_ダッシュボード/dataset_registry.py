@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional, Set, Tuple
+from data_processor import DataProcessor
+from dataset import Dataset
+
+# ハッシュ計算時に一度に読み込むバイト数
+HASH_CHUNK_SIZE = 1024 * 1024
+# どのセッションからも参照されなくなったデータセットを破棄するまでの秒数
+DATASET_IDLE_TIMEOUT = 300
+
+# ファイルを識別するキー（絶対パス, サイズ, 更新時刻）
+StatKey = Tuple[str, int, int]
+
+
+class _Entry:
+    """レジストリ内のデータセットと参照カウント"""
+
+    def __init__(self, stat_key: StatKey):
+        self.stat_key = stat_key  # 最初に開いたファイルのキー
+        self.content_hash: Optional[str] = None  # ハッシュの計算後に設定
+        self.future: Future = Future()  # スキーマの読み込み完了後にDatasetが設定される
+        self.refcount = 0
+        self.timer: Optional[threading.Timer] = None  # アイドル時の破棄タイマー
+        self.discarded = False  # レジストリから削除済みかどうか
+        self.hash_stop = threading.Event()  # 破棄された場合にハッシュ計算を中断する
+
+
+class DatasetRegistry:
+    """プロセス全体で共有するデータセットのレジストリクラス
+    Flet の Web モードでは main(page) がセッションごとに呼ばれるため、同じ内容のファイルは
+    1度だけパースし、列・統計情報・グラフ系列をセッション間で共有する。
+    まず (パス, サイズ, 更新時刻) で検索し、内容のハッシュはスキーマの読み込みと並行して計算する。
+    """
+
+    def __init__(self, idle_timeout: float = DATASET_IDLE_TIMEOUT):
+        """レジストリの初期化
+        Args:
+            idle_timeout (float): 参照がなくなってから破棄するまでの秒数
+        """
+        self.idle_timeout = idle_timeout
+        self.data_processor = DataProcessor()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}  # 内容のハッシュ → エントリ
+        self._opening: Dict[StatKey, _Entry] = {}  # ハッシュ計算中のファイル → エントリ
+        self._hashes: Dict[StatKey, str] = {}  # 登録中のファイル → 内容のハッシュ
+        self._holders: Dict[Dataset, _Entry] = {}  # データセット → エントリ（解放時に使用）
+        self._tasks: Set[asyncio.Task] = set()  # 実行中の読み込みタスク（GCされないよう保持）
+
+    async def acquire(self, file_path: str) -> Dataset:
+        """データセットを取得し、参照カウントを増やす
+        Args:
+            file_path (str): CSVファイルのパス
+        Returns:
+            Dataset: 共有されたデータセット（読み取り専用として扱うこと）
+        """
+        stat_key = self._stat_key(file_path)
+        with self._lock:
+            entry = self._find(stat_key)
+            if entry is None:
+                entry = self._opening[stat_key] = _Entry(stat_key)
+                # 要求したセッションがキャンセルされても他のセッションに影響しないよう、独立したタスクで開く
+                task = asyncio.create_task(self._open(file_path, entry))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            entry.refcount += 1
+            if entry.timer is not None:
+                entry.timer.cancel()  # 再び参照されたため破棄を取り消す
+                entry.timer = None
+        try:
+            return await asyncio.shield(asyncio.wrap_future(entry.future))
+        except BaseException:
+            self._decref(entry)  # 失敗・キャンセル時も参照カウントを戻す
+            raise
+
+    def release(self, dataset: Dataset):
+        """データセットの参照カウントを減らし、参照がなくなればアイドル破棄を予約する
+        Args:
+            dataset (Dataset): acquire で取得したデータセット
+        """
+        with self._lock:
+            entry = self._holders.get(dataset)
+        if entry is not None:
+            self._decref(entry)
+
+    def _find(self, stat_key: StatKey) -> Optional[_Entry]:
+        """登録済みまたは読み込み中のエントリを検索（ロック取得中に呼ぶ）
+        Args:
+            stat_key (StatKey): ファイルのキー
+        Returns:
+            Optional[_Entry]: 見つかったエントリ
+        """
+        content_hash = self._hashes.get(stat_key)
+        if content_hash is not None and content_hash in self._entries:
+            return self._entries[content_hash]
+        return self._opening.get(stat_key)
+
+    async def _open(self, file_path: str, entry: _Entry):
+        """スキーマの読み込みとハッシュ計算を並行して実行
+        Args:
+            file_path (str): CSVファイルのパス
+            entry (_Entry): 読み込み結果を設定するエントリ
+        """
+        loop = asyncio.get_running_loop()
+        hashing = loop.run_in_executor(None, self._hash_file, file_path, entry.hash_stop)
+        hashing.add_done_callback(lambda f: f.cancelled() or f.exception())  # 中断時の未取得例外を防ぐ
+        try:
+            dataset = await Dataset.open(file_path, self.data_processor)
+        except BaseException as e:
+            with self._lock:
+                self._discard(entry)
+            entry.future.set_exception(e)  # 待機中のセッションへ伝える
+            if not isinstance(e, Exception):
+                raise
+            return
+        with self._lock:
+            self._holders[dataset] = entry
+        entry.future.set_result(dataset)  # ハッシュの完了を待たずにスキーマを表示できるようにする
+        logging.info(f"データセット '{file_path}' をレジストリに登録しました。")
+
+        try:
+            content_hash = await hashing
+        except Exception as e:
+            # ハッシュが得られない場合は、同じ (パス, サイズ, 更新時刻) からの取得でのみ共有する
+            logging.warning(f"'{file_path}' のハッシュ計算に失敗しました: {e}")
+            return
+        with self._lock:
+            dataset.content_hash = entry.content_hash = content_hash
+            if self._opening.get(entry.stat_key) is entry:
+                del self._opening[entry.stat_key]
+            if entry.discarded or content_hash is None:
+                return  # ハッシュ計算中に破棄された
+            self._hashes[entry.stat_key] = content_hash
+            canonical = self._entries.get(content_hash)
+            if canonical is None:
+                self._entries[content_hash] = entry
+            elif canonical is not entry:
+                self._merge(entry, dataset, canonical)
+
+    def _merge(self, entry: _Entry, dataset: Dataset, canonical: _Entry):
+        """同じ内容が別のパスで登録済みの場合、既存のエントリへ統合する（ロック取得中に呼ぶ）
+        Web モードではアップロードごとにパスが変わるため、ここで統合しないとセッションごとに列が複製される。
+        Args:
+            entry (_Entry): 統合するエントリ
+            dataset (Dataset): 統合するエントリのデータセット
+            canonical (_Entry): 統合先のエントリ
+        """
+        dataset.share_from(canonical.future.result())  # 以降の列の読み込みと統計情報は統合先と共有
+        canonical.refcount += entry.refcount
+        if canonical.refcount > 0 and canonical.timer is not None:
+            canonical.timer.cancel()
+            canonical.timer = None
+        self._holders[dataset] = canonical  # 解放時は統合先の参照カウントを減らす
+        entry.refcount = 0
+        if entry.timer is not None:
+            entry.timer.cancel()
+            entry.timer = None
+        self._discard(entry)
+        logging.info(f"データセット '{entry.stat_key[0]}' を同じ内容の登録済みデータセットへ統合しました。")
+
+    def _decref(self, entry: _Entry):
+        """参照カウントを減らし、参照がなくなればアイドル破棄を予約する
+        Args:
+            entry (_Entry): 対象のエントリ
+        """
+        with self._lock:
+            entry.refcount -= 1
+            if entry.refcount <= 0 and entry.timer is None and not entry.discarded:
+                entry.timer = threading.Timer(self.idle_timeout, self._evict, args=(entry,))
+                entry.timer.daemon = True
+                entry.timer.start()
+
+    def _evict(self, entry: _Entry):
+        """参照されていないデータセットの破棄
+        Args:
+            entry (_Entry): 破棄を予約したエントリ
+        """
+        with self._lock:
+            if entry.refcount > 0:
+                return
+            entry.timer = None
+            self._discard(entry)
+            logging.info(f"データセット '{entry.stat_key[0]}' をレジストリから破棄しました。")
+
+    def _discard(self, entry: _Entry):
+        """エントリとそれを指すキャッシュを削除（ロック取得中に呼ぶ）
+        Args:
+            entry (_Entry): 削除するエントリ
+        """
+        entry.discarded = True
+        entry.hash_stop.set()
+        if self._opening.get(entry.stat_key) is entry:
+            del self._opening[entry.stat_key]
+        if entry.content_hash is not None and self._entries.get(entry.content_hash) is entry:
+            del self._entries[entry.content_hash]
+        # 参照先がなくなったハッシュのメモを削除
+        for stat_key, content_hash in list(self._hashes.items()):
+            if content_hash not in self._entries:
+                del self._hashes[stat_key]
+        for dataset, holder in list(self._holders.items()):
+            if holder is entry:
+                del self._holders[dataset]
+
+    def _stat_key(self, file_path: str) -> StatKey:
+        """ファイルのキーを取得
+        Args:
+            file_path (str): ファイルのパス
+        Returns:
+            StatKey: (絶対パス, サイズ, 更新時刻)
+        """
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+    def _hash_file(self, file_path: str, stop: Optional[threading.Event] = None) -> Optional[str]:
+        """ファイル内容のハッシュ計算
+        Args:
+            file_path (str): ファイルのパス
+            stop (threading.Event, optional): 設定されると計算を中断する
+        Returns:
+            Optional[str]: SHA-256 の16進文字列（中断した場合は None）
+        """
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                if stop is not None and stop.is_set():
+                    return None  # 読み込みの失敗や破棄により不要になった
+                sha.update(chunk)
+        return sha.hexdigest()
+
+
+# プロセス全体で共有するレジストリ
+registry = DatasetRegistry()
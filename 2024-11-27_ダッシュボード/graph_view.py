@@ -1,5 +1,5 @@
 import flet as ft
-import pandas as pd
+from typing import Sequence, Tuple
 import constants  # 定数をインポート
 
 class GraphView:
@@ -50,24 +50,16 @@ class GraphView:
             expand=True  # コンテナを拡張
         )
 
-    def update_data(self, df: pd.DataFrame):
-        """グラフデータの更新
+    def update_series(self, points: Sequence[Tuple[int, float]]):
+        """計算済みの系列によるグラフの更新
         Args:
-            df (pd.DataFrame): 更新するデータフレーム
+            points (Sequence[Tuple[int, float]]): X値とY値の組（間引き済みの共有データ）
         """
-        if df.empty:
-            return  # データフレームが空の場合は終了
-
-        numeric_cols = df.select_dtypes(include=['number']).columns  # 数値カラムを取得
-        if len(numeric_cols) == 0:
-            return  # 数値カラムがない場合は終了
-
-        first_numeric_col = numeric_cols[0]  # 最初の数値カラムを選択
         self.chart.data_series = [
             ft.LineChartData(
                 data_points=[
-                    ft.LineChartDataPoint(x=x, y=float(y))  # 各データポイントを設定
-                    for x, y in enumerate(df[first_numeric_col])
+                    ft.LineChartDataPoint(x=x, y=y)  # 各データポイントを設定
+                    for x, y in points
                 ],
                 stroke_width=2,  # 線の太さを設定
                 color=ft.colors.BLUE,  # 線の色を設定
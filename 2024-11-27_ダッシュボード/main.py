@@ -1,13 +1,22 @@
 import flet as ft
-import pandas as pd
-from typing import Optional
+import os
+import uuid
+from typing import Dict, Optional
 from graph_view import GraphView  # GraphViewをインポート
+from data_processor import DataProcessor  # DataProcessorをインポート
+from dataset import Dataset  # Datasetをインポート
+from dataset_registry import registry  # セッション間で共有するデータセットのレジストリ
 import constants  # 定数をインポート
 
 class ModernDataDashboard:
     def __init__(self, page: ft.Page):
         self.page = page
-        self.df: Optional[pd.DataFrame] = None
+        # データ本体はセッション間で共有し、選択列やテーマはセッションごとに保持する
+        self.dataset: Optional[Dataset] = None
+        self.selected_column: Optional[str] = None
+        self.uploads: Dict[str, str] = {}  # Web モードでアップロード中のファイル名 → 保存先のファイル名
+        self.closed = False
+        self.page.on_close = self.on_session_closed  # セッション終了時にデータセットを解放
         self.page.theme_mode = ft.ThemeMode.LIGHT  # ライトモード固定
         self.setup_page()
         self.init_components()
@@ -51,10 +60,14 @@ class ModernDataDashboard:
     def init_components(self):
         """UIコンポーネントの初期化"""
         self.file_picker = ft.FilePicker(
-            on_result=self.on_file_picked
+            on_result=self.on_file_picked,
+            on_upload=self.on_file_uploaded,
         )
         self.page.overlay.append(self.file_picker)
 
+        # 読み込み進捗（圧縮ファイルは圧縮後のバイト数で計算）
+        self.progress_bar = ft.ProgressBar(value=0, width=300, visible=False)
+
         # ファイルアップロードエリア
         self.upload_area = ft.Container(
             content=ft.Column([
@@ -69,9 +82,10 @@ class ModernDataDashboard:
                     "ファイルを選択",
                     icon=ft.icons.FILE_UPLOAD,
                     on_click=lambda _: self.file_picker.pick_files(
-                        allowed_extensions=["csv"]
+                        allowed_extensions=DataProcessor.SUPPORTED_EXTENSIONS
                     )
                 ),
+                self.progress_bar,
             ], 
             alignment=ft.MainAxisAlignment.CENTER,
             horizontal_alignment=ft.CrossAxisAlignment.CENTER,
@@ -83,6 +97,14 @@ class ModernDataDashboard:
             height=200,
         )
 
+        # グラフ・統計情報の対象列の選択
+        self.column_selector = ft.Dropdown(
+            label="表示する列",
+            options=[],
+            on_change=self.on_column_selected,
+            disabled=True,
+        )
+
         # 統計情報エリア
         self.stats_view = ft.ListView(
             expand=True,
@@ -142,6 +164,7 @@ class ModernDataDashboard:
                     ft.Container(
                         content=ft.Column([
                             ft.Text("基本統計情報", size=16, weight=ft.FontWeight.BOLD),
+                            self.column_selector,
                             self.stats_view,
                         ]),
                         bgcolor=ft.colors.SURFACE_VARIANT,
@@ -177,60 +200,156 @@ class ModernDataDashboard:
 
     async def on_file_picked(self, e: ft.FilePickerResultEvent):
         """ファイル選択時の処理"""
-        if e.files:
-            file_path = e.files[0].path
-            try:
-                self.df = pd.read_csv(file_path)
-                self.update_displays()
-                self.graph_view.update_data(self.df)  # グラフを更新
-                # スナックバーを表示
-                snack = ft.SnackBar(content=ft.Text("データを正常に読み込みました"))
-                self.page.snack_bar = snack
-                snack.open = True
-                self.page.update()
-            except Exception as ex:
-                # エラースナックバーを表示
-                snack = ft.SnackBar(content=ft.Text(f"エラーが発生しました: {str(ex)}"))
-                self.page.snack_bar = snack
-                snack.open = True
+        if not e.files:
+            return
+        file = e.files[0]
+        if file.path is not None:
+            await self.open_file(file.path)
+            return
+        # Web モードではパスが得られないため、サーバーへアップロードしてから読み込む
+        # （同名のファイルを上書きしないよう保存先の名前を一意にし、拡張子は展開形式の判定のため残す）
+        target = f"{uuid.uuid4().hex}_{file.name}"
+        self.uploads[file.name] = target
+        self.progress_bar.value = 0
+        self.progress_bar.visible = True
+        self.page.update()
+        self.file_picker.upload([
+            ft.FilePickerUploadFile(
+                file.name,
+                upload_url=self.page.get_upload_url(target, constants.UPLOAD_URL_EXPIRES),
+            )
+        ])
+
+    async def on_file_uploaded(self, e: ft.FilePickerUploadEvent):
+        """アップロードの進捗と完了時の処理"""
+        if e.error:
+            self.uploads.pop(e.file_name, None)
+            self.progress_bar.visible = False
+            snack = ft.SnackBar(content=ft.Text(f"アップロードに失敗しました: {e.error}"))
+            self.page.snack_bar = snack
+            snack.open = True
+            self.page.update()
+            return
+        if e.progress is None or e.progress < 1.0:
+            self.progress_bar.value = e.progress
+            self.progress_bar.update()
+            return
+        target = self.uploads.pop(e.file_name, None)
+        if target is not None:
+            # アップロードごとにパスは変わるが、内容が同じならレジストリで共有される
+            await self.open_file(os.path.join(constants.UPLOAD_DIR, target))
+
+    async def open_file(self, file_path: str):
+        """ファイルを開いて表示を更新
+        Args:
+            file_path (str): 読み込むファイルのパス
+        """
+        try:
+            # ヘッダとサンプルのみを先に読み込み、列名と型を即座に表示
+            dataset = await registry.acquire(file_path)
+            if self.closed:
+                registry.release(dataset)  # 読み込み中にセッションが終了した
+                return
+            self.release_dataset()  # 前に開いていたデータセットを解放
+            self.dataset = dataset
+            self.update_schema_displays()
+
+            # ビューが必要とする列のみを読み込む
+            numeric_cols = self.dataset.numeric_columns
+            if numeric_cols:
+                await self.load_view_columns(numeric_cols[0])
+            # スナックバーを表示
+            snack = ft.SnackBar(content=ft.Text("データを正常に読み込みました"))
+            self.page.snack_bar = snack
+            snack.open = True
+            self.page.update()
+        except Exception as ex:
+            self.progress_bar.visible = False
+            # エラースナックバーを表示
+            snack = ft.SnackBar(content=ft.Text(f"エラーが発生しました: {str(ex)}"))
+            self.page.snack_bar = snack
+            snack.open = True
+            self.page.update()
+
+    async def on_column_selected(self, e):
+        """表示列の変更時の処理（未読み込みの列はこの時点で読み込む）"""
+        if self.dataset is None or not self.column_selector.value:
+            return
+        try:
+            await self.load_view_columns(self.column_selector.value)
+        except Exception as ex:
+            self.progress_bar.visible = False
+            snack = ft.SnackBar(content=ft.Text(f"エラーが発生しました: {str(ex)}"))
+            self.page.snack_bar = snack
+            snack.open = True
+            self.page.update()
+
+    async def load_view_columns(self, column: str):
+        """グラフと統計情報に必要な列を読み込んで表示を更新
+        Args:
+            column (str): 表示する列名
+        """
+        self.progress_bar.value = 0
+        self.progress_bar.visible = True
+        self.page.update()
+        while True:
+            self.column_selector.value = column
+            await self.dataset.get_columns([column], on_progress=self.on_load_progress)
+            if column in self.dataset.numeric_columns:
+                break
+            # サンプル外の値により数値列でないと判明した場合は、選択肢から外して次の数値列を表示
+            self.update_column_options()
+            if not self.dataset.numeric_columns:
+                self.selected_column = None
+                self.column_selector.value = None
+                self.progress_bar.visible = False
                 self.page.update()
+                return
+            column = self.dataset.numeric_columns[0]
+        self.selected_column = column
+        self.progress_bar.visible = False
+        await self.update_displays()
+        self.graph_view.update_series(await self.dataset.get_chart_series(column))  # グラフを更新
+
+    def release_dataset(self):
+        """このセッションが参照しているデータセットの解放"""
+        if self.dataset is not None:
+            registry.release(self.dataset)
+            self.dataset = None
+            self.selected_column = None
+
+    def on_session_closed(self, e):
+        """セッション終了時の処理"""
+        self.closed = True
+        self.release_dataset()
+
+    def on_load_progress(self, done: int, total: int):
+        """読み込み進捗の更新"""
+        if self.closed:
+            return  # 共有の読み込みが続いていても、終了したセッションの画面は更新しない
+        self.progress_bar.value = min(done / total, 1.0) if total else None
+        self.progress_bar.update()
 
-    def update_displays(self):
-        """表示の更新"""
-        if self.df is None:
+    def update_schema_displays(self):
+        """スキーマとサンプルによる表示の更新（全列のパースを待たずに表示）"""
+        if self.dataset is None:
             return
 
-        # 統計情報の更新
-        stats = []
-        stats.append(ft.Text(f"行数: {len(self.df)}", size=16))
-        stats.append(ft.Text(f"列数: {len(self.df.columns)}", size=16))
-        
-        # ヘッダ行の更新（必要に応じて列名を動的に取得）
+        # ヘッダ行の更新（列名と推定した型）
         self.data_header.content = ft.Text(
-            ", ".join(self.df.columns),
+            ", ".join(f"{col} ({dtype})" for col, dtype in self.dataset.schema.items()),
             weight=ft.FontWeight.BOLD
         )
-        
-        numeric_cols = self.df.select_dtypes(include=['int64', 'float64']).columns
-        for col in numeric_cols:
-            col_stats = self.df[col].describe()
-            stats.append(
-                ft.Container(
-                    content=ft.Column([
-                        ft.Text(f"{col}の統計情報:", weight=ft.FontWeight.BOLD),
-                        ft.Text(f"平均: {col_stats['mean']:.2f}"),
-                        ft.Text(f"合計: {self.df[col].sum():.2f}")
-                    ]),
-                    bgcolor=ft.colors.BLUE_50,
-                    padding=10,
-                    border_radius=10
-                )
-            )
-        self.stats_view.controls = stats
 
-        # データプレビューの更新（ヘッダは除外）
+        self.update_column_options()
+
+        self.stats_view.controls = [
+            ft.Text(f"列数: {len(self.dataset.columns)}", size=16)
+        ]
+
+        # データプレビューの更新（サンプル行を使用、ヘッダは除外）
         data_rows = []
-        for _, row in self.df.head(10).iterrows():
+        for _, row in self.dataset.sample.head(10).iterrows():
             data_rows.append(
                 ft.Container(
                     content=ft.Text(", ".join(str(cell) for cell in row)),
@@ -239,7 +358,40 @@ class ModernDataDashboard:
                 )
             )
         self.data_view.controls = data_rows
-        
+
+        self.page.update()
+
+    def update_column_options(self):
+        """列の選択肢を数値列で更新"""
+        self.column_selector.options = [
+            ft.dropdown.Option(col) for col in self.dataset.numeric_columns
+        ]
+        self.column_selector.disabled = not self.column_selector.options
+
+    async def update_displays(self):
+        """統計情報の更新"""
+        if self.dataset is None or self.selected_column is None:
+            return
+
+        col = self.selected_column
+        col_stats = await self.dataset.get_stats(col)  # 計算済みの統計情報を共有
+        stats = []
+        stats.append(ft.Text(f"行数: {col_stats['count']}", size=16))
+        stats.append(ft.Text(f"列数: {len(self.dataset.columns)}", size=16))
+        stats.append(
+            ft.Container(
+                content=ft.Column([
+                    ft.Text(f"{col}の統計情報:", weight=ft.FontWeight.BOLD),
+                    ft.Text(f"平均: {col_stats['mean']:.2f}"),
+                    ft.Text(f"合計: {col_stats['sum']:.2f}")
+                ]),
+                bgcolor=ft.colors.BLUE_50,
+                padding=10,
+                border_radius=10
+            )
+        )
+        self.stats_view.controls = stats
+
         self.page.update()
 
 def main(page: ft.Page):
@@ -250,4 +402,4 @@ def main(page: ft.Page):
     page.add(dashboard.main_content)
 
 if __name__ == "__main__":
-    ft.app(target=main)
\ No newline at end of file
+    ft.app(target=main, upload_dir=constants.UPLOAD_DIR)
\ No newline at end of file
@@ -0,0 +1,361 @@
+import asyncio
+import bz2
+import gzip
+import io
+import threading
+import zipfile
+
+import pandas as pd
+import pytest
+
+from data_processor import SCHEMA_SAMPLE_ROWS, DataProcessor, _PipelinedReader
+from dataset import CHART_MAX_POINTS, Dataset
+from dataset_registry import DatasetRegistry
+
+CSV_TEXT = "a,b,s\n" + "".join(f"{i},{i * 0.5},x{i}\n" for i in range(5000))
+
+
+@pytest.fixture
+def csv_bytes() -> bytes:
+    return CSV_TEXT.encode("utf-8")
+
+
+def _write_compressed(tmp_path, csv_bytes: bytes, name: str) -> str:
+    """テスト用の圧縮ファイルを作成"""
+    path = tmp_path / name
+    if name.endswith(".gz"):
+        path.write_bytes(gzip.compress(csv_bytes))
+    elif name.endswith(".bz2"):
+        path.write_bytes(bz2.compress(csv_bytes))
+    elif name.endswith(".zst"):
+        zstandard = pytest.importorskip("zstandard")
+        path.write_bytes(zstandard.ZstdCompressor().compress(csv_bytes))
+    elif name.endswith(".zip"):
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("data.csv", csv_bytes)
+    else:
+        path.write_bytes(csv_bytes)
+    return str(path)
+
+
+class _EndlessSource:
+    """読み込みが終わらない展開ストリームの代わり"""
+
+    def __init__(self):
+        self.closed = False
+
+    def read(self, size: int = -1) -> bytes:
+        return b"0" * size
+
+    def close(self):
+        self.closed = True
+
+
+class _FailingSource:
+    """展開中に失敗するストリームの代わり"""
+
+    def read(self, size: int = -1) -> bytes:
+        raise EOFError("壊れた圧縮データ")
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("name", ["data.csv", "data.csv.gz", "data.csv.bz2", "data.csv.zst", "data.zip"])
+def test_load_csv_streams_compressed_inputs(tmp_path, csv_bytes, name):
+    path = _write_compressed(tmp_path, csv_bytes, name)
+    progress = []
+
+    async def run():
+        df = await DataProcessor().load_csv(path, on_progress=lambda done, total: progress.append((done, total)))
+        await asyncio.sleep(0)  # call_soon_threadsafe で予約された進捗通知を処理
+        return df
+
+    df = asyncio.run(run())
+    pd.testing.assert_frame_equal(df, pd.read_csv(io.BytesIO(csv_bytes)))
+    assert progress and progress[-1][0] == progress[-1][1]
+    assert all(done <= total for done, total in progress)
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            assert progress[-1][1] == archive.getinfo("data.csv").compress_size  # メンバーの圧縮サイズで計測
+
+
+@pytest.mark.parametrize("name", ["data.json.gz", "data.tar.gz", "data.bz2"])
+def test_load_csv_rejects_non_csv_compressed_files(tmp_path, csv_bytes, name):
+    path = _write_compressed(tmp_path, csv_bytes, name)
+    with pytest.raises(ValueError, match="対応していないファイル形式"):
+        asyncio.run(DataProcessor().load_csv(path))
+
+
+def test_load_csv_raises_on_truncated_gzip(tmp_path, csv_bytes):
+    path = tmp_path / "broken.csv.gz"
+    path.write_bytes(gzip.compress(csv_bytes)[:-100])
+    with pytest.raises(EOFError):
+        asyncio.run(DataProcessor().load_csv(str(path)))
+
+
+def test_pipelined_reader_stops_thread_on_early_close():
+    raw = io.BytesIO()
+    source = _EndlessSource()
+    reader = _PipelinedReader(source, raw)
+    assert len(reader.read(10)) == 10
+    reader.close()
+    assert not reader._thread.is_alive()
+    assert source.closed and raw.closed
+
+
+def test_pipelined_reader_reraises_source_error():
+    reader = _PipelinedReader(_FailingSource(), io.BytesIO())
+    with pytest.raises(EOFError):
+        reader.read(10)
+    reader.close()
+    assert not reader._thread.is_alive()
+
+
+def _open_dataset(path: str) -> Dataset:
+    return asyncio.run(Dataset.open(path, DataProcessor()))
+
+
+def test_dataset_falls_back_when_value_outside_sample_is_not_numeric(tmp_path):
+    rows = "".join(f"{i},{i}\n" for i in range(SCHEMA_SAMPLE_ROWS + 10))
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n" + rows + "oops,1\n", encoding="utf-8")
+    dataset = _open_dataset(str(path))
+    assert dataset.numeric_columns == ["a", "b"]
+
+    df = asyncio.run(dataset.get_columns(["a", "b"]))
+    assert df["a"].iloc[-1] == "oops"
+    assert df["b"].dtype == "float64"
+    assert dataset.schema == {"a": "object", "b": "float64"}
+    assert dataset.numeric_columns == ["b"]
+
+
+def test_dataset_loads_duplicate_headers_by_position(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,a,b\n1,2,3\n4,5,6\n", encoding="utf-8")
+    dataset = _open_dataset(str(path))
+    df = asyncio.run(dataset.get_columns(["a.1"]))
+    assert df["a.1"].tolist() == [2.0, 5.0]
+
+
+def test_dataset_does_not_reparse_on_non_dtype_errors(tmp_path, monkeypatch):
+    rows = "".join(f"{i},{i}\n" for i in range(SCHEMA_SAMPLE_ROWS + 10))
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n" + rows + '"1,2\n', encoding="utf-8")  # サンプル外に閉じていない引用符
+    dataset = _open_dataset(str(path))
+    calls = []
+    original = DataProcessor.load_csv
+
+    async def counting_load_csv(self, *args, **kwargs):
+        calls.append(kwargs)
+        return await original(self, *args, **kwargs)
+
+    monkeypatch.setattr(DataProcessor, "load_csv", counting_load_csv)
+    with pytest.raises(pd.errors.ParserError):
+        asyncio.run(dataset.get_columns(["a"]))
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def data_csv(tmp_path) -> str:
+    path = tmp_path / "data.csv"
+    path.write_text(CSV_TEXT, encoding="utf-8")
+    return str(path)
+
+
+def test_get_columns_waiter_cancellation_does_not_break_loader(data_csv):
+    async def run():
+        dataset = await Dataset.open(data_csv, DataProcessor())
+        loader = asyncio.create_task(dataset.get_columns(["a"]))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(dataset.get_columns(["a"]))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        df = await loader
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return df
+
+    assert len(asyncio.run(run())) == 5000
+
+
+def test_get_columns_loader_cancellation_does_not_hang_waiter(data_csv):
+    async def run():
+        dataset = await Dataset.open(data_csv, DataProcessor())
+        loader = asyncio.create_task(dataset.get_columns(["a"]))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(dataset.get_columns(["a"]))
+        await asyncio.sleep(0)
+        loader.cancel()
+        return await asyncio.wait_for(waiter, timeout=10)
+
+    assert len(asyncio.run(run())) == 5000
+
+
+def test_get_columns_returns_data_that_cannot_change_shared_state(data_csv):
+    async def run():
+        dataset = await Dataset.open(data_csv, DataProcessor())
+        df = await dataset.get_columns(["a"])
+        df.iloc[0, 0] = 99
+        return await dataset.get_columns(["a"])
+
+    assert asyncio.run(run())["a"].iloc[0] == 0
+
+
+def test_chart_series_is_downsampled(data_csv):
+    async def run():
+        dataset = await Dataset.open(data_csv, DataProcessor())
+        return await dataset.get_chart_series("a")
+
+    points = asyncio.run(run())
+    assert len(points) <= CHART_MAX_POINTS
+    assert points[0] == (0, 0.0) and points[-1] == (4999, 4999.0)
+
+
+def test_registry_shares_dataset_and_evicts_when_idle(data_csv):
+    registry = DatasetRegistry(idle_timeout=0.05)
+
+    async def run():
+        datasets = await asyncio.gather(*[registry.acquire(data_csv) for _ in range(5)])
+        assert len({id(d) for d in datasets}) == 1
+        await asyncio.sleep(0.1)  # ハッシュ計算の完了を待つ
+        assert len(registry._entries) == 1 and len(registry._hashes) == 1
+        assert await registry.acquire(data_csv) is datasets[0]
+        for dataset in datasets + [datasets[0]]:
+            registry.release(dataset)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert not registry._entries and not registry._hashes and not registry._holders
+
+
+def test_registry_owner_cancellation_does_not_break_other_sessions(data_csv):
+    registry = DatasetRegistry(idle_timeout=0.05)
+
+    async def run():
+        owner = asyncio.create_task(registry.acquire(data_csv))
+        await asyncio.sleep(0)
+        other = asyncio.create_task(registry.acquire(data_csv))
+        await asyncio.sleep(0)
+        owner.cancel()
+        dataset = await asyncio.wait_for(other, timeout=10)
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        assert await registry.acquire(data_csv) is dataset
+        entry = registry._holders[dataset]
+        assert entry.refcount == 2  # キャンセルされたセッションの参照は戻されている
+        registry.release(dataset)
+        registry.release(dataset)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert not registry._entries and not registry._holders
+
+
+def test_registry_returns_schema_before_hash_completes(data_csv, monkeypatch):
+    registry = DatasetRegistry()
+    hashing_done = threading.Event()
+    original = DatasetRegistry._hash_file
+
+    def slow_hash(self, file_path, stop=None):
+        hashing_done.wait(10)
+        return original(self, file_path, stop)
+
+    monkeypatch.setattr(DatasetRegistry, "_hash_file", slow_hash)
+
+    async def run():
+        dataset = await asyncio.wait_for(registry.acquire(data_csv), timeout=5)
+        assert dataset.content_hash is None
+        assert await registry.acquire(data_csv) is dataset  # ハッシュ計算中も同じパスなら共有
+        hashing_done.set()
+
+    asyncio.run(run())
+
+
+def test_registry_merges_same_content_opened_from_different_paths(tmp_path, monkeypatch):
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    first.write_text(CSV_TEXT, encoding="utf-8")
+    second.write_text(CSV_TEXT, encoding="utf-8")
+    registry = DatasetRegistry(idle_timeout=0.05)
+    calls = []
+    original = DataProcessor.load_csv
+
+    async def counting_load_csv(self, *args, **kwargs):
+        calls.append(args)
+        return await original(self, *args, **kwargs)
+
+    monkeypatch.setattr(DataProcessor, "load_csv", counting_load_csv)
+
+    async def run():
+        canonical = await registry.acquire(str(first))
+        await asyncio.sleep(0.1)  # ハッシュ計算の完了を待つ
+        await canonical.get_columns(["a"])
+        duplicate = await registry.acquire(str(second))
+        await asyncio.sleep(0.1)
+        assert registry._holders[duplicate] is registry._holders[canonical]
+        assert registry._holders[canonical].refcount == 2
+        assert len(registry._entries) == 1
+        df = await duplicate.get_columns(["a"])  # 統合先で読み込み済みのため再パースしない
+        assert len(df) == 5000 and len(calls) == 1
+        assert await registry.acquire(str(second)) is canonical
+        for dataset in (canonical, duplicate, canonical):
+            registry.release(dataset)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert not registry._entries and not registry._hashes and not registry._holders
+
+
+def test_get_columns_reports_progress_to_every_waiting_session(data_csv):
+    async def run():
+        dataset = await Dataset.open(data_csv, DataProcessor())
+        first, second = [], []
+        await asyncio.gather(
+            dataset.get_columns(["a"], on_progress=lambda done, total: first.append(done)),
+            dataset.get_columns(["a"], on_progress=lambda done, total: second.append(done)),
+        )
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first and second
+
+
+def test_get_columns_drops_failing_progress_callbacks(data_csv):
+    def closed_session(done, total):
+        raise RuntimeError("ページは閉じられています")
+
+    async def run():
+        dataset = await Dataset.open(data_csv, DataProcessor())
+        progress = []
+        await asyncio.gather(
+            dataset.get_columns(["a"], on_progress=closed_session),
+            dataset.get_columns(["a"], on_progress=lambda done, total: progress.append(done)),
+        )
+        return progress
+
+    assert asyncio.run(run())
+
+
+def test_registry_stops_hashing_when_schema_load_fails(data_csv, monkeypatch):
+    registry = DatasetRegistry()
+    stopped = []
+
+    async def failing_open(cls, file_path, data_processor):
+        raise ValueError("読み込み失敗")
+
+    def waiting_hash(self, file_path, stop=None):
+        stopped.append(stop.wait(5))  # 中断の要求を待つ
+        return None
+
+    monkeypatch.setattr(Dataset, "open", classmethod(failing_open))
+    monkeypatch.setattr(DatasetRegistry, "_hash_file", waiting_hash)
+    with pytest.raises(ValueError):
+        asyncio.run(registry.acquire(data_csv))
+    assert stopped == [True]
+    assert not registry._opening and not registry._entries
+
+
+def test_hash_file_stops_when_requested(data_csv):
+    stop = threading.Event()
+    stop.set()
+    assert DatasetRegistry()._hash_file(data_csv, stop) is None